@@ -0,0 +1,29 @@
+"""
+Rebuild the hourly and daily invite counters from the raw invite_joins collection
+
+Stop the bot first, counters are overwritten and joins made during the backfill would be lost.
+
+Usage: python src/backfill_invite_counters.py
+"""
+import os
+
+from dotenv import load_dotenv
+
+import invite_counters
+import mongo
+
+
+def main():
+    load_dotenv()
+    mongo.init(os.getenv('MONGO_URI', 'mongodb://mongo:27017/wintonbot'), 'winton_bot')
+
+    try:
+        invite_counters.ensure_indexes()
+        written = invite_counters.backfill(mongo.get_collection('invite_joins'))
+        print(f"Wrote {written} invite counter documents")
+    finally:
+        mongo.close()
+
+
+if __name__ == '__main__':
+    main()
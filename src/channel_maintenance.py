@@ -0,0 +1,124 @@
+import asyncio
+import logging
+from collections import Counter
+from datetime import timedelta
+from typing import Callable, List, Optional
+
+import discord
+
+# Discord rejects bulk deletes of messages older than 14 days, keep some margin
+BULK_DELETE_MAX_AGE = timedelta(days=14) - timedelta(minutes=10)
+BULK_DELETE_MAX_MESSAGES = 100
+# Delay between single deletes of messages too old for bulk delete
+PACED_DELETE_INTERVAL = 1.5
+
+# REST calls made by this module, by kind
+rest_calls = Counter()
+
+# Channels where Discord refused a bulk delete, no point in trying again every update
+_bulk_delete_refused = set()
+
+_paced_queue: Optional[asyncio.Queue] = None
+_paced_worker: Optional[asyncio.Task] = None
+
+
+async def find_bot_messages(
+        channel: discord.abc.Messageable,
+        bot_user: discord.abc.User,
+        predicate: Optional[Callable[[discord.Message], bool]] = None,
+        limit: int = 50
+) -> List[discord.Message]:
+    """Scan the last `limit` messages of `channel` for messages by `bot_user`, newest first"""
+    rest_calls['history'] += (limit + 99) // 100
+    return [
+        message async for message in channel.history(limit=limit)
+        if message.author == bot_user and (predicate is None or predicate(message))
+    ]
+
+
+async def purge(channel: discord.TextChannel, messages: List[discord.abc.Snowflake]) -> int:
+    """
+    Delete `messages` with as few REST calls as possible
+
+    Messages younger than 14 days are deleted in bulk, up to 100 per call.
+    Older messages (or all of them, if bulk delete is not permitted) are
+    handed to a paced background queue. Returns the REST calls made now.
+    """
+    now = discord.utils.utcnow()
+    can_bulk_delete = channel.id not in _bulk_delete_refused and _can_manage_messages(channel)
+    recent = []
+    old = []
+    for message in messages:
+        if can_bulk_delete and now - discord.utils.snowflake_time(message.id) < BULK_DELETE_MAX_AGE:
+            recent.append(message)
+        else:
+            old.append(message)
+
+    calls = 0
+    for start in range(0, len(recent), BULK_DELETE_MAX_MESSAGES):
+        chunk = recent[start:start + BULK_DELETE_MAX_MESSAGES]
+        try:
+            calls += 1
+            if len(chunk) == 1:
+                # Bulk delete requires at least two messages
+                rest_calls['delete'] += 1
+                await chunk[0].delete()
+            else:
+                rest_calls['bulk_delete'] += 1
+                await channel.delete_messages(chunk)
+        except discord.NotFound:
+            pass
+        except discord.Forbidden as e:
+            logging.warning("Bulk delete refused in %s, using paced deletes from now on: %s" % (channel, str(e)))
+            _bulk_delete_refused.add(channel.id)
+            old.extend(chunk)
+        except discord.HTTPException as e:
+            # A stale message in the batch, delete them one by one
+            logging.warning("Bulk delete in %s failed, falling back to paced deletes: %s" % (channel, str(e)))
+            old.extend(chunk)
+
+    for message in old:
+        _enqueue_paced_delete(message)
+
+    logging.debug("Purged %d messages in %s with %d REST calls (%d queued)" % (len(messages), channel, calls, len(old)))
+    return calls
+
+
+def _can_manage_messages(channel: discord.TextChannel) -> bool:
+    # Bulk delete needs Manage Messages, even for the bot's own messages
+    guild = getattr(channel, 'guild', None)
+    if guild is None or guild.me is None:
+        return True
+    return channel.permissions_for(guild.me).manage_messages
+
+
+def _enqueue_paced_delete(message: discord.abc.Snowflake):
+    global _paced_queue, _paced_worker
+
+    if _paced_queue is None:
+        _paced_queue = asyncio.Queue()
+    _paced_queue.put_nowait(message)
+    if _paced_worker is None or _paced_worker.done():
+        _paced_worker = asyncio.create_task(_run_paced_deletes())
+
+
+async def _run_paced_deletes():
+    while not _paced_queue.empty():
+        message = _paced_queue.get_nowait()
+        try:
+            rest_calls['delete'] += 1
+            await message.delete()
+        except discord.NotFound:
+            pass
+        except discord.HTTPException as e:
+            logging.error("Failed to delete message %s: %s" % (message.id, str(e)))
+        await asyncio.sleep(PACED_DELETE_INTERVAL)
+
+
+def format_stats() -> str:
+    lines = ["Channel maintenance REST calls"]
+    for kind, count in sorted(rest_calls.items()):
+        lines.append(f"{kind:<40} {count:>6}")
+    if len(lines) == 1:
+        lines.append("(no calls recorded yet)")
+    return '\n'.join(lines)
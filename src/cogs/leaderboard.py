@@ -1,32 +1,39 @@
+import asyncio
 import logging
-from dataclasses import dataclass
+import os
+import threading
+import time
 import discord
 import requests
 from aiohttp import request
 from discord.ext import commands
 from discord.ext import tasks
 from mongo import get_collection
-from overwatch_api import OverwatchAPI
+from player_stat import PlayerStat
+from util import truncate_string, validate_battletag
+import channel_maintenance
+import player_import
+import profiler
 from datetime import datetime, timezone
 from pymongo import MongoClient
-from dataclasses import dataclass, field
+from pymongo.errors import OperationFailure, PyMongoError
 
-overwatch_api = OverwatchAPI()
-
-
-@dataclass
-class PlayerStat:
-    discord_id: int
-    blizzard_username: str
-    last_fetched: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
-    stats: list = field(default_factory=list)
+CHANGE_STREAM_STATE_ID = "player_stat_change_stream"
+# "The $changeStream stage is only supported on replica sets"
+CHANGE_STREAM_UNSUPPORTED_CODES = (40573,)
+# ChangeStreamHistoryLost / ChangeStreamFatalError
+CHANGE_STREAM_RESUME_FAILED_CODES = (286, 280)
+LEADERBOARD_DEBOUNCE_SECONDS = 5
+# Cap for changes made outside of a stats sweep, sweeps always publish once when they are done
+LEADERBOARD_MAX_DEBOUNCE_SECONDS = 30
 
 
 class Leaderboard(commands.Cog):
     def __init__(self, bot: discord.Bot):
         self.bot: discord.Bot = bot
 
-        self.leaderboard_channel = 1426238135876190321
+        # Legacy single-guild channel, used for guilds without a LeaderboardConfig entry
+        self.leaderboard_channel = int(os.getenv('LEADERBOARD_CHANNEL_ID', '1426238135876190321'))
         self.rank_values = {
             'grandmaster': 7,
             'master': 6,
@@ -44,27 +51,35 @@ class Leaderboard(commands.Cog):
             print(f"Error initializing player stats collection: {str(e)}")
             raise RuntimeError("Failed to initialize player stats collection")
 
+        self.leaderboard_state_collection = get_collection("LeaderboardState")
+        self.leaderboard_config_collection = get_collection("LeaderboardConfig")
+        self.player_rows = {}
+        # channel id -> ids of the messages we posted last, saves a history scan per update
+        self.leaderboard_message_ids = {}
+        self.summary_message_ids = {}
+        self.change_stream_enabled = os.getenv('LEADERBOARD_CHANGE_STREAM', '').lower() in ('1', 'true', 'yes')
+        self._change_stream_stop = threading.Event()
+        self._pending_resume_token = None
+        self._last_change_at = 0.0
+        self._publish_task = None
+        self._sweep_running = False
+
         self.fetch_player_stats.start()
-        self.update_leaderboard.start()
+        if self.change_stream_enabled:
+            self.watch_player_stats.start()
+        else:
+            self.update_leaderboard.start()
 
     @tasks.loop(hours=1)
+    @profiler.timed("Leaderboard.fetch_player_stats")
     async def fetch_player_stats(self):
-        for player in self.player_stats_collection.find():
-            battletag = player['blizzard_username']
-            logging.debug("Fetching player stats for %s" % battletag)
-
-            try:
-                get_player_summary_result = overwatch_api.get_player_summary(battletag)
-                if get_player_summary_result is not None:
-                    self.player_stats_collection.update_one(
-                        {"discord_id": player['discord_id']},
-                        {"$push": {"stats": get_player_summary_result},
-                         "$set": {"last_fetched": datetime.now(timezone.utc)}}
-                    )
-            except requests.HTTPError as e:
-                logging.error("Failed to fetch or save player stats for %s: %s" % (battletag, str(e)))
-            except Exception as e:
-                logging.error("Unknown error while fetching stats for %s: %s" % (battletag, str(e)))
+        # One sweep for all guilds, battletags registered in several guilds are only fetched once
+        players = list(self.player_stats_collection.find({}, {"discord_id": 1, "blizzard_username": 1}))
+        self._sweep_running = True
+        try:
+            await player_import.fetch_stats(self.player_stats_collection, players)
+        finally:
+            self._sweep_running = False
 
         @self.bot.slash_command(name="refreshstats", description="Refresh the stats of all registered players")
         async def register_player(ctx: discord.ApplicationContext):
@@ -235,97 +250,275 @@ class Leaderboard(commands.Cog):
         
         return ranked_players
 
+    def build_player_row(self, player):
+        if not player.get('stats'):
+            return None
+        latest_stats = player['stats'][-1]
+        comp_data = (latest_stats.get('competitive') or {}).get('pc') or {}
+
+        tank_data = comp_data.get('tank')
+        damage_data = comp_data.get('damage')
+        support_data = comp_data.get('support')
+
+        tank_rank_str = f"{tank_data['division'].capitalize()}-{tank_data['tier']}" if tank_data else '-'
+        damage_rank_str = f"{damage_data['division'].capitalize()}-{damage_data['tier']}" if damage_data else '-'
+        support_rank_str = f"{support_data['division'].capitalize()}-{support_data['tier']}" if support_data else '-'
+
+        roles_data = []
+        if tank_data:
+            roles_data.append(('tank', self.get_role_rank_value(tank_data)))
+        if damage_data:
+            roles_data.append(('damage', self.get_role_rank_value(damage_data)))
+        if support_data:
+            roles_data.append(('support', self.get_role_rank_value(support_data)))
+
+        if not roles_data:
+            return None
+
+        top_role_data = max(roles_data, key=lambda x: x[1])
+        top_role_name = top_role_data[0]
+        highest_rank_value = top_role_data[1]
+        top_emoji = {'tank': '🛡', 'damage': '🔫', 'support': '💉'}[top_role_name]
+
+        return {
+            'discord_id': player['discord_id'],
+            'guild_ids': player.get('guild_ids') or [],
+            'blizzard_username': player['blizzard_username'],
+            'tank_rank': tank_rank_str,
+            'damage_rank': damage_rank_str,
+            'support_rank': support_rank_str,
+            'highest_rank_value': highest_rank_value,
+            'top_emoji': top_emoji
+        }
+
+    def reload_player_rows(self):
+        self.player_rows = {}
+        for player in self.player_stats_collection.find({}, {"stats": {"$slice": -1}}):
+            row = self.build_player_row(player)
+            if row:
+                self.player_rows[player['_id']] = row
+
     @tasks.loop(minutes=1)
+    @profiler.timed("Leaderboard.update_leaderboard")
     async def update_leaderboard(self):
         try:
-            if self.bot.guilds is None or len(self.bot.guilds) == 0:
-                print("Bot is not in any guilds yet.")
-                return
-            
-            channel = self.bot.get_channel(self.leaderboard_channel)
+            self.reload_player_rows()
+            await self.publish_leaderboard()
+        except Exception as e:
+            print(f"Error updating leaderboard: {str(e)}")
+
+    def get_leaderboard_channels(self):
+        """Returns a mapping of guild id to leaderboard channel id"""
+        channels = {config['guild_id']: config['channel_id'] for config in self.leaderboard_config_collection.find()}
+        legacy_channel = self.bot.get_channel(self.leaderboard_channel)
+        if legacy_channel is not None and legacy_channel.guild.id not in channels:
+            channels[legacy_channel.guild.id] = self.leaderboard_channel
+        return channels
+
+    def get_legacy_guild_id(self):
+        legacy_channel = self.bot.get_channel(self.leaderboard_channel)
+        return legacy_channel.guild.id if legacy_channel is not None else None
+
+    async def publish_leaderboard(self):
+        if self.bot.guilds is None or len(self.bot.guilds) == 0:
+            print("Bot is not in any guilds yet.")
+            return
+
+        channels = self.get_leaderboard_channels()
+        if not channels:
+            print("No leaderboard channels configured")
+            return
+
+        # Rank once and filter the shared ranking per guild
+        ranked_players = sorted(self.player_rows.values(), key=lambda x: x['highest_rank_value'], reverse=True)
+        discord_names = {}
+        legacy_guild_id = self.get_legacy_guild_id()
+
+        for guild_id, channel_id in channels.items():
+            channel = self.bot.get_channel(channel_id)
             if not channel:
-                print("Could not find leaderboard channel")
-                return
+                print(f"Could not find leaderboard channel {channel_id} for guild {guild_id}")
+                continue
 
-            # Delete previous leaderboard messages
-            async for message in channel.history(limit=50):
-                if message.author == self.bot.user and "LEADERBOARD" in message.content:
-                    await message.delete()
+            # Players registered before guild scoping belong to the legacy guild, whichever channel it uses now
+            guild_players = [
+                player for player in ranked_players
+                if guild_id in player['guild_ids'] or (not player['guild_ids'] and guild_id == legacy_guild_id)
+            ]
+            try:
+                await self.publish_guild_leaderboard(channel, guild_players, discord_names)
+            except Exception as e:
+                print(f"Error publishing leaderboard for guild {guild_id}: {str(e)}")
+
+    async def publish_guild_leaderboard(self, channel, ranked_players, discord_names):
+        # Delete previous leaderboard messages, only scanning the history when we don't know them yet
+        message_ids = self.leaderboard_message_ids.get(channel.id)
+        if message_ids is None:
+            previous_messages = await channel_maintenance.find_bot_messages(
+                channel, self.bot.user, lambda message: "LEADERBOARD" in message.content, limit=50)
+        else:
+            previous_messages = [channel.get_partial_message(message_id) for message_id in message_ids]
+        await channel_maintenance.purge(channel, previous_messages)
+        # Track messages as they are sent, so a failed send can't leave untracked messages behind
+        sent_message_ids = self.leaderboard_message_ids[channel.id] = []
+
+        message_lines = ["**LEADERBOARD**"]
+
+        for idx, player in enumerate(ranked_players, 1):
+            # Names are cached per publish so players in several guilds are only fetched once
+            if player['discord_id'] not in discord_names:
+                member = await self.bot.fetch_user(player['discord_id'])
+                discord_names[player['discord_id']] = member.name if member else "Unknown"
+            discord_name = discord_names[player['discord_id']]
+
+            line = (f"{idx}. {player['top_emoji']} {discord_name} ({player['blizzard_username']})    "
+                    f"🛡 {player['tank_rank']}   🔫 {player['damage_rank']}    💉 {player['support_rank']}")
+            message_lines.append(line)
+
+        # Split into messages if too long
+        current_message = ""
+        for line in message_lines:
+            if len(current_message) + len(line) + 1 > 2000:
+                channel_maintenance.rest_calls['send'] += 1
+                sent_message_ids.append((await channel.send(current_message)).id)
+                current_message = line
+            else:
+                if current_message:
+                    current_message += "\n" + line
+                else:
+                    current_message = line
 
-            all_players = list(self.player_stats_collection.find())
-            ranked_players = []
-            
-            for player in all_players:
-                if not player.get('stats'):
+        if current_message:
+            channel_maintenance.rest_calls['send'] += 1
+            sent_message_ids.append((await channel.send(current_message)).id)
+
+    @tasks.loop(count=1)
+    async def watch_player_stats(self):
+        """Apply PlayerStat changes from a change stream, falling back to polling on standalone servers"""
+        self.reload_player_rows()
+        loop = asyncio.get_running_loop()
+        result = loop.create_future()
+
+        def run():
+            try:
+                outcome = (result.set_result, self._watch_player_stats(loop))
+            except Exception as e:
+                outcome = (result.set_exception, e)
+            try:
+                loop.call_soon_threadsafe(*outcome)
+            except RuntimeError:
+                # The loop is already closed, the bot is shutting down
+                pass
+
+        # A daemon thread instead of asyncio.to_thread, pycord does not unload cogs on shutdown so
+        # the stop event is never set and joining an executor thread would hang the interpreter at exit
+        threading.Thread(target=run, name="player-stat-change-stream", daemon=True).start()
+        supported = await result
+        if not supported and not self.update_leaderboard.is_running():
+            print("Change streams are not supported by this MongoDB deployment, falling back to polling.")
+            self.update_leaderboard.start()
+
+    def _watch_player_stats(self, loop: asyncio.AbstractEventLoop) -> bool:
+        # Runs in a worker thread, pymongo change streams block while waiting for events
+        state = self.leaderboard_state_collection.find_one({"_id": CHANGE_STREAM_STATE_ID})
+        resume_token = state.get('resume_token') if state else None
+        # Only ship the latest stats entry instead of the full history with every event
+        pipeline = [{"$set": {"fullDocument.stats": {"$slice": ["$fullDocument.stats", -1]}}}]
+
+        while not self._change_stream_stop.is_set():
+            try:
+                with self.player_stats_collection.watch(
+                        pipeline,
+                        full_document='updateLookup',
+                        resume_after=resume_token,
+                        max_await_time_ms=1000) as stream:
+                    print("Watching PlayerStat change stream")
+                    while stream.alive and not self._change_stream_stop.is_set():
+                        change = stream.try_next()
+                        if change is None:
+                            continue
+                        if change['operationType'] == 'invalidate':
+                            # The collection was dropped or renamed, its resume tokens can't be resumed after
+                            resume_token = None
+                            loop.call_soon_threadsafe(self._reload_after_invalidate)
+                            break
+                        resume_token = stream.resume_token
+                        # drop, rename and dropDatabase events don't refer to a single player
+                        if 'documentKey' not in change:
+                            continue
+                        loop.call_soon_threadsafe(self._apply_player_change, change, resume_token)
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAM_UNSUPPORTED_CODES:
+                    return False
+                if resume_token is not None and e.code in CHANGE_STREAM_RESUME_FAILED_CODES:
+                    logging.warning("Stored resume token is no longer valid, restarting change stream: %s" % str(e))
+                    resume_token = None
                     continue
-                latest_stats = player['stats'][-1]
-                comp_data = latest_stats.get('competitive', {}).get('pc', {})
-                
-                tank_data = comp_data.get('tank')
-                damage_data = comp_data.get('damage')
-                support_data = comp_data.get('support')
-
-                tank_rank_str = f"{tank_data['division'].capitalize()}-{tank_data['tier']}" if tank_data else '-'
-                damage_rank_str = f"{damage_data['division'].capitalize()}-{damage_data['tier']}" if damage_data else '-'
-                support_rank_str = f"{support_data['division'].capitalize()}-{support_data['tier']}" if support_data else '-'
-
-                roles_data = []
-                if tank_data:
-                    roles_data.append(('tank', self.get_role_rank_value(tank_data)))
-                if damage_data:
-                    roles_data.append(('damage', self.get_role_rank_value(damage_data)))
-                if support_data:
-                    roles_data.append(('support', self.get_role_rank_value(support_data)))
-                
-                if not roles_data:
+                logging.error("PlayerStat change stream failed: %s" % str(e))
+                self._change_stream_stop.wait(5)
+            except PyMongoError as e:
+                logging.error("PlayerStat change stream interrupted: %s" % str(e))
+                self._change_stream_stop.wait(5)
+        return True
+
+    def _apply_player_change(self, change, resume_token):
+        key = change['documentKey']['_id']
+        player = change.get('fullDocument') or {}
+
+        row = None
+        if change['operationType'] != 'delete' and player.get('discord_id') is not None:
+            row = self.build_player_row(player)
+        if row:
+            self.player_rows[key] = row
+        else:
+            self.player_rows.pop(key, None)
+
+        self._pending_resume_token = resume_token
+        self._schedule_publish()
+
+    def _reload_after_invalidate(self):
+        self.reload_player_rows()
+        self._pending_resume_token = None
+        self._schedule_publish()
+
+    def _schedule_publish(self):
+        self._last_change_at = time.monotonic()
+        if self._publish_task is None or self._publish_task.done():
+            self._publish_task = asyncio.create_task(self._debounced_publish())
+
+    async def _debounced_publish(self):
+        # Collapse a burst of changes (e.g. one fetch_player_stats sweep) into a single publish
+        while True:
+            first_change_at = self._last_change_at
+            while True:
+                now = time.monotonic()
+                quiet_for = now - self._last_change_at
+                if self._sweep_running:
+                    # A sweep writes players back to back, publish once after it finished
+                    await asyncio.sleep(LEADERBOARD_DEBOUNCE_SECONDS)
                     continue
+                if quiet_for >= LEADERBOARD_DEBOUNCE_SECONDS or now - first_change_at >= LEADERBOARD_MAX_DEBOUNCE_SECONDS:
+                    break
+                await asyncio.sleep(LEADERBOARD_DEBOUNCE_SECONDS - quiet_for)
 
-                top_role_data = max(roles_data, key=lambda x: x[1])
-                top_role_name = top_role_data[0]
-                highest_rank_value = top_role_data[1]
-                top_emoji = {'tank': '🛡', 'damage': '🔫', 'support': '💉'}[top_role_name]
-                
-                ranked_players.append({
-                    'discord_id': player['discord_id'],
-                    'blizzard_username': player['blizzard_username'],
-                    'tank_rank': tank_rank_str,
-                    'damage_rank': damage_rank_str,
-                    'support_rank': support_rank_str,
-                    'highest_rank_value': highest_rank_value,
-                    'top_emoji': top_emoji
-                })
-            
-            # Sort by highest_rank_value descending
-            ranked_players.sort(key=lambda x: x['highest_rank_value'], reverse=True)
-            
-            message_lines = ["**LEADERBOARD**"]
-            
-            for idx, player in enumerate(ranked_players, 1):
-                member = await self.bot.fetch_user(player['discord_id'])
-                discord_name = member.name if member else "Unknown"
-                
-                line = (f"{idx}. {player['top_emoji']} {discord_name} ({player['blizzard_username']})    "
-                        f"🛡 {player['tank_rank']}   🔫 {player['damage_rank']}    💉 {player['support_rank']}")
-                message_lines.append(line)
-            
-            # Split into messages if too long
-            current_message = ""
-            for line in message_lines:
-                if len(current_message) + len(line) + 1 > 2000:
-                    await channel.send(current_message)
-                    current_message = line
-                else:
-                    if current_message:
-                        current_message += "\n" + line
-                    else:
-                        current_message = line
-            
-            if current_message:
-                await channel.send(current_message)
-        
-        except Exception as e:
-            print(f"Error updating leaderboard: {str(e)}")
+            publish_started_at = time.monotonic()
+            resume_token = self._pending_resume_token
+            try:
+                await self.publish_leaderboard()
+                self.leaderboard_state_collection.update_one(
+                    {"_id": CHANGE_STREAM_STATE_ID},
+                    {"$set": {"resume_token": resume_token, "updated_at": datetime.now(timezone.utc)}},
+                    upsert=True
+                )
+            except Exception as e:
+                print(f"Error publishing leaderboard: {str(e)}")
 
+            # Changes applied while publishing did not schedule a publish of their own
+            if self._last_change_at < publish_started_at:
+                return
+
+    def cog_unload(self):
+        self._change_stream_stop.set()
 
     # @update_leaderboard.before_loop
     # async def before_update_leaderboard(self):
@@ -344,32 +537,98 @@ class Leaderboard(commands.Cog):
     async def register_player(self, ctx: discord.ApplicationContext, username: str):
         username = username.strip()
         # validate for valid blizzard username
-        # check for presence of one '#'
-        if not username or '#' not in username:
-            await ctx.respond("Please provide a valid Blizzard username (e.g., Player#123456).", ephemeral=True)
-            return
-        # check for tag length
-        tag = username.split('#')[-1]
-        if len(tag) > 6 or len(tag) < 4 or not tag.isdigit():
-            await ctx.respond("Please provide a valid Blizzard username with a tag (e.g., Player#123456).", ephemeral=True)
+        error = validate_battletag(username)
+        if error:
+            await ctx.respond(error, ephemeral=True)
             return
         
         # store in database
         try:
             existing_player = self.player_stats_collection.find_one({"discord_id": ctx.author.id})
             if existing_player:
-                await ctx.respond("You are already registered.", ephemeral=True)
+                if ctx.guild_id is None or ctx.guild_id in existing_player.get('guild_ids', []):
+                    await ctx.respond("You are already registered.", ephemeral=True)
+                    return
+                player_import.adopt_legacy_players(
+                    self.player_stats_collection, [ctx.author.id], self.get_legacy_guild_id())
+                self.player_stats_collection.update_one(
+                    {"discord_id": ctx.author.id},
+                    {"$addToSet": {"guild_ids": ctx.guild_id}}
+                )
+                await ctx.respond("You are already registered, added you to this server's leaderboard.", ephemeral=True)
                 return
-            new_player = PlayerStat(discord_id=ctx.author.id, blizzard_username=username)
+            new_player = PlayerStat(
+                discord_id=ctx.author.id,
+                blizzard_username=username,
+                guild_ids=[ctx.guild_id] if ctx.guild_id else []
+            )
             self.player_stats_collection.insert_one(new_player.__dict__)
-            # fetch adhoc
-            await self.fetch_player_stats()
+            # fetch adhoc, only for the new player
+            await player_import.fetch_stats(self.player_stats_collection, [new_player.__dict__])
             await ctx.respond(f"Successfully registered {username}!", ephemeral=True)
         except Exception as e:
             await ctx.respond("An error occurred while registering. Please try again later.", ephemeral=True)
 
+    @commands.slash_command(name="importplayers", description="Bulk register players from a discord_id,battletag CSV")
+    @discord.default_permissions(administrator=True)
+    @discord.option(
+        name="file",
+        description="CSV file with discord_id,battletag rows",
+        input_type=discord.Attachment
+    )
+    async def import_players(self, ctx: discord.ApplicationContext, file: discord.Attachment):
+        await ctx.defer(ephemeral=True)
+        try:
+            text = (await file.read()).decode('utf-8-sig')
+            players, errors = player_import.parse_players_csv(text)
+            players_to_fetch = player_import.upsert_players(
+                self.player_stats_collection, players, ctx.guild_id, self.get_legacy_guild_id())
+
+            summary = f"Imported {len(players)} players ({len(players_to_fetch)} new or with a changed battletag, {len(errors)} rejected rows)."
+            if errors:
+                summary += "\n" + truncate_string("\n".join(errors), 1500)
+            await ctx.edit(content=summary)
+
+            last_progress_at = 0.0
+
+            async def report_progress(done: int, total: int):
+                nonlocal last_progress_at
+                # Interaction edits are rate limited, only report every few seconds
+                if done != total and time.monotonic() - last_progress_at < 3:
+                    return
+                last_progress_at = time.monotonic()
+                await ctx.edit(content=f"{summary}\n\nFetching stats: {done}/{total} battletags")
+
+            if players_to_fetch:
+                stored = await player_import.fetch_stats(
+                    self.player_stats_collection, players_to_fetch, progress=report_progress)
+                await ctx.edit(content=f"{summary}\n\nStored initial stats for {stored}/{len(players_to_fetch)} players.")
+        except Exception as e:
+            print(f"Error importing players: {str(e)}")
+            await ctx.edit(content="An error occurred while importing players!")
+
+
+    @commands.slash_command(name="setleaderboardchannel", description="Post this server's leaderboard in a channel")
+    @discord.default_permissions(administrator=True)
+    @discord.option(
+        name="channel",
+        description="Channel to post the leaderboard in",
+        input_type=discord.TextChannel
+    )
+    async def set_leaderboard_channel(self, ctx: discord.ApplicationContext, channel: discord.TextChannel):
+        try:
+            self.leaderboard_config_collection.update_one(
+                {"guild_id": ctx.guild_id},
+                {"$set": {"channel_id": channel.id, "updated_at": datetime.now(timezone.utc)}},
+                upsert=True
+            )
+            await ctx.respond(f"Leaderboard will be posted in {channel.mention}.", ephemeral=True)
+        except Exception as e:
+            print(f"Error setting leaderboard channel: {str(e)}")
+            await ctx.respond("An error occurred while setting the leaderboard channel!", ephemeral=True)
 
     @tasks.loop(hours=1)
+    @profiler.timed("Leaderboard.update_leaderboard_message")
     async def update_leaderboard_message(self):
         channel = self.bot.get_channel(self.leaderboard_channel)
         if channel is None:
@@ -429,17 +688,31 @@ class Leaderboard(commands.Cog):
             )
 
         # Try to update previous leaderboard message
-        async for message in channel.history(limit=100):
-            if message.author == self.bot.user:
-                try:
-                    await message.edit(content=leaderboard_message)
-                    print("Leaderboard message updated.")
-                    return
-                except Exception as e:
-                    print(f"Error updating leaderboard message: {str(e)}")
-                    raise RuntimeError("Failed to update leaderboard message")
+        message_id = self.summary_message_ids.get(channel.id)
+        if message_id is not None:
+            previous_messages = [channel.get_partial_message(message_id)]
+        else:
+            previous_messages = await channel_maintenance.find_bot_messages(
+                channel, self.bot.user, lambda message: message.content.startswith("**Overwatch 2 Leaderboard**"),
+                limit=100)
+        if previous_messages:
+            try:
+                channel_maintenance.rest_calls['edit'] += 1
+                await previous_messages[0].edit(content=leaderboard_message)
+                self.summary_message_ids[channel.id] = previous_messages[0].id
+                # Remove duplicates left behind by earlier runs
+                await channel_maintenance.purge(channel, previous_messages[1:])
+                print("Leaderboard message updated.")
+                return
+            except discord.NotFound:
+                self.summary_message_ids.pop(channel.id, None)
+            except Exception as e:
+                print(f"Error updating leaderboard message: {str(e)}")
+                raise RuntimeError("Failed to update leaderboard message")
         # If not found, send a new message
-        await channel.send(content=leaderboard_message)
+        channel_maintenance.rest_calls['send'] += 1
+        message = await channel.send(content=leaderboard_message)
+        self.summary_message_ids[channel.id] = message.id
 
 def setup(bot: discord.Bot):
     print("Loading Leaderboard Cog")
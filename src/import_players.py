@@ -0,0 +1,54 @@
+"""
+Bulk import players from a CSV of `discord_id,battletag` rows
+
+Usage: python src/import_players.py players.csv [--guild-id ID] [--legacy-guild-id ID] [--concurrency N] [--skip-fetch]
+"""
+import argparse
+import asyncio
+import os
+
+from dotenv import load_dotenv
+
+import mongo
+import player_import
+
+
+async def print_progress(done: int, total: int):
+    if done == total or done % 25 == 0:
+        print(f"Fetched stats for {done}/{total} battletags")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import players from a discord_id,battletag CSV")
+    parser.add_argument("csv_file")
+    parser.add_argument("--guild-id", type=int, help="Add the players to this guild's leaderboard")
+    parser.add_argument("--legacy-guild-id", type=int,
+                        help="Guild of LEADERBOARD_CHANNEL_ID, keeps players registered before guild scoping on its leaderboard")
+    parser.add_argument("--concurrency", type=int, default=player_import.FETCH_CONCURRENCY)
+    parser.add_argument("--skip-fetch", action="store_true", help="Only register players, let the hourly sweep fetch their stats")
+    args = parser.parse_args()
+
+    load_dotenv()
+    mongo.init(os.getenv('MONGO_URI', 'mongodb://mongo:27017/wintonbot'), 'winton_bot')
+
+    try:
+        with open(args.csv_file, encoding='utf-8-sig') as f:
+            players, errors = player_import.parse_players_csv(f.read())
+
+        for error in errors:
+            print(error)
+
+        collection = mongo.get_collection("PlayerStat")
+        players_to_fetch = player_import.upsert_players(collection, players, args.guild_id, args.legacy_guild_id)
+        print(f"Imported {len(players)} players ({len(players_to_fetch)} new or with a changed battletag, {len(errors)} rejected rows)")
+
+        if players_to_fetch and not args.skip_fetch:
+            stored = asyncio.run(player_import.fetch_stats(
+                collection, players_to_fetch, args.concurrency, print_progress))
+            print(f"Stored initial stats for {stored}/{len(players_to_fetch)} players")
+    finally:
+        mongo.close()
+
+
+if __name__ == '__main__':
+    main()
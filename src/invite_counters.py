@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from pymongo import ASCENDING, UpdateOne
+
+import mongo
+
+COLLECTION_NAME = 'invite_join_counters'
+
+GRANULARITIES = {
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+
+# (label, upper bound in days), the last bucket has no upper bound
+ACCOUNT_AGE_BUCKETS = [
+    ('lt_1d', 1),
+    ('1d_7d', 7),
+    ('7d_30d', 30),
+    ('30d_1y', 365),
+    ('gte_1y', None),
+]
+
+
+def get_collection():
+    return mongo.get_collection(COLLECTION_NAME)
+
+
+def ensure_indexes():
+    get_collection().create_index(
+        [('invite_code', ASCENDING), ('granularity', ASCENDING), ('bucket', ASCENDING), ('guild_id', ASCENDING)],
+        unique=True
+    )
+
+
+def floor_bucket(moment: datetime, granularity: str) -> datetime:
+    """Floor `moment` to the start of its hour or day in UTC"""
+    if moment.tzinfo is None:
+        # pymongo returns naive datetimes in UTC
+        moment = moment.replace(tzinfo=timezone.utc)
+    moment = moment.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    if granularity == 'day':
+        moment = moment.replace(hour=0)
+    return moment
+
+
+def account_age_bucket(joined_at: Optional[datetime], created_at: Optional[datetime]) -> str:
+    if joined_at is None or created_at is None:
+        return 'unknown'
+    if (joined_at.tzinfo is None) != (created_at.tzinfo is None):
+        joined_at = joined_at.replace(tzinfo=None)
+        created_at = created_at.replace(tzinfo=None)
+    age_days = (joined_at - created_at).days
+    for label, upper_bound in ACCOUNT_AGE_BUCKETS:
+        if upper_bound is None or age_days < upper_bound:
+            return label
+    return 'unknown'
+
+
+def _increments(joins: int, bots: int, age_counts: dict) -> dict:
+    increments = {'joins': joins, 'bots': bots, 'humans': joins - bots}
+    for label, count in age_counts.items():
+        increments[f'account_age.{label}'] = count
+    return increments
+
+
+def record_join(invite_code: str, guild_id: str, joined_at: Optional[datetime],
+                created_at: Optional[datetime], is_bot: bool):
+    """Increment the hourly and daily counters of `invite_code` for one join"""
+    joined_at = joined_at or datetime.now(timezone.utc)
+    increments = _increments(1, int(is_bot), {account_age_bucket(joined_at, created_at): 1})
+
+    operations = [
+        UpdateOne(
+            {'invite_code': invite_code, 'guild_id': guild_id,
+             'granularity': granularity, 'bucket': floor_bucket(joined_at, granularity)},
+            {'$inc': increments},
+            upsert=True
+        )
+        for granularity in GRANULARITIES
+    ]
+    get_collection().bulk_write(operations, ordered=False)
+
+
+def get_buckets(invite_code: str, granularity: str, since: datetime) -> List[dict]:
+    """Counters of `invite_code` from `since` on, summed across guilds and sorted by bucket"""
+    buckets = {}
+    for counter in get_collection().find({
+        'invite_code': invite_code,
+        'granularity': granularity,
+        'bucket': {'$gte': floor_bucket(since, granularity)}
+    }):
+        bucket = buckets.setdefault(counter['bucket'], {'bucket': counter['bucket'], 'joins': 0, 'bots': 0,
+                                                        'humans': 0, 'account_age': {}})
+        for key in ('joins', 'bots', 'humans'):
+            bucket[key] += counter.get(key, 0)
+        for label, count in counter.get('account_age', {}).items():
+            bucket['account_age'][label] = bucket['account_age'].get(label, 0) + count
+    return [buckets[key] for key in sorted(buckets)]
+
+
+def backfill(joins_collection) -> int:
+    """
+    Rebuild all counters from the raw `invite_joins` documents
+
+    Counters are overwritten with `$set`, so running the backfill again is safe.
+    Run it while the bot is stopped, joins counted during the scan would be lost.
+    Returns the number of counter documents written.
+    """
+    counters = {}
+    for join in joins_collection.find({}, {'invite_code': 1, 'guild_id': 1, 'joined_at': 1,
+                                           'created_at': 1, 'is_bot': 1}):
+        if not join.get('invite_code') or not join.get('joined_at'):
+            continue
+        age_label = account_age_bucket(join['joined_at'], join.get('created_at'))
+        for granularity in GRANULARITIES:
+            key = (join['invite_code'], join.get('guild_id'), granularity,
+                   floor_bucket(join['joined_at'], granularity))
+            counter = counters.setdefault(key, {'joins': 0, 'bots': 0, 'account_age': {}})
+            counter['joins'] += 1
+            counter['bots'] += int(join.get('is_bot', False))
+            counter['account_age'][age_label] = counter['account_age'].get(age_label, 0) + 1
+
+    operations = [
+        UpdateOne(
+            {'invite_code': invite_code, 'guild_id': guild_id, 'granularity': granularity, 'bucket': bucket},
+            {'$set': {'joins': counter['joins'], 'bots': counter['bots'],
+                      'humans': counter['joins'] - counter['bots'], 'account_age': counter['account_age']}},
+            upsert=True
+        )
+        for (invite_code, guild_id, granularity, bucket), counter in counters.items()
+    ]
+    collection = get_collection()
+    for start in range(0, len(operations), 1000):
+        collection.bulk_write(operations[start:start + 1000], ordered=False)
+    return len(operations)
@@ -0,0 +1,78 @@
+"""
+Run the stats fetch pipeline against replayed fixtures and report throughput and memory
+
+Nothing is sent to the Overwatch API or written to MongoDB, results are discarded.
+Record fixtures first with OVERWATCH_API_MODE=record.
+
+Usage: python src/load_test.py [--players 10000] [--concurrency N] [--latency-ms MS]
+                               [--error-rate R] [--rate-limit-rate R] [--retry-after S]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+import tracemalloc
+
+
+class DiscardCollection:
+    """Stands in for the PlayerStat collection, only counts the writes"""
+
+    def __init__(self):
+        self.writes = 0
+
+    def update_many(self, filter, update):
+        self.writes += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the stats fetch pipeline offline")
+    parser.add_argument("--players", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=0.1)
+    parser.add_argument("--fixtures", default=None)
+    args = parser.parse_args()
+
+    # The API client reads its configuration on import
+    os.environ['OVERWATCH_API_MODE'] = 'replay'
+    os.environ['OVERWATCH_REPLAY_LATENCY_MS'] = str(args.latency_ms)
+    os.environ['OVERWATCH_REPLAY_ERROR_RATE'] = str(args.error_rate)
+    os.environ['OVERWATCH_REPLAY_429_RATE'] = str(args.rate_limit_rate)
+    os.environ['OVERWATCH_REPLAY_RETRY_AFTER'] = str(args.retry_after)
+    if args.fixtures:
+        os.environ['OVERWATCH_API_FIXTURES'] = args.fixtures
+    logging.basicConfig(level=logging.CRITICAL)
+
+    import player_import
+
+    if not len(player_import.overwatch_api.fixtures):
+        print(f"No fixtures found at {player_import.overwatch_api.fixtures.path}, record some first.")
+        return
+
+    players = [
+        {'discord_id': index, 'blizzard_username': f"LoadTest{index}#{1000 + index % 9000}"}
+        for index in range(args.players)
+    ]
+    collection = DiscardCollection()
+    concurrency = args.concurrency or player_import.FETCH_CONCURRENCY
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    stored = asyncio.run(player_import.fetch_stats(collection, players, concurrency))
+    elapsed = time.perf_counter() - start
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"Players:      {len(players)} (concurrency {concurrency})")
+    print(f"Stored:       {stored} ({len(players) - stored} failed)")
+    print(f"Elapsed:      {elapsed:.2f}s")
+    print(f"Throughput:   {len(players) / elapsed:.1f} players/s")
+    print(f"Peak memory:  {peak_memory / 1024 / 1024:.1f} MiB")
+    print(f"Responses:    {dict(player_import.overwatch_api.faults.stats)}")
+
+
+if __name__ == '__main__':
+    main()
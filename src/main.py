@@ -1,15 +1,23 @@
+import asyncio
+import io
 import random
 import os
+from datetime import datetime, timedelta, timezone
 
 import discord
 from dotenv import load_dotenv
+from util import sparkline
+import channel_maintenance
+import invite_counters
 import mongo
 import posthog_tracker
+import profiler
 
 load_dotenv()
 
 mongo.init(os.getenv('MONGO_URI', 'mongodb://mongo:27017/wintonbot'), 'winton_bot')
 posthog_tracker.init()
+invite_counters.ensure_indexes()
 
 bot = discord.Bot(debug_guilds=os.getenv('BOT_DEV_GUILDS', '1425571463192121354').split(';'))
 
@@ -30,6 +38,7 @@ for cock in COCKS:
 @bot.event
 async def on_ready():
     print(f"{bot.user} is ready and online!")
+    profiler.init(asyncio.get_running_loop())
     
     # Cache invites for all guilds
     for guild in bot.guilds:
@@ -86,6 +95,16 @@ async def on_member_join(member: discord.Member):
                 'is_bot': member.bot
             }
             joins_collection.insert_one(join_data)
+            try:
+                invite_counters.record_join(
+                    invite_code=invite_code,
+                    guild_id=str(member.guild.id),
+                    joined_at=member.joined_at,
+                    created_at=member.created_at,
+                    is_bot=member.bot
+                )
+            except Exception as e:
+                print(f"Error updating invite counters: {e}")
             
             # Track conversion in PostHog if it matches target invite
             if invite_code == TARGET_INVITE_CODE:
@@ -175,9 +194,105 @@ async def invite_stats(ctx: discord.ApplicationContext, invite_code: str = TARGE
         await ctx.respond(f"Error fetching stats: {str(e)}", ephemeral=True)
 
 
+@bot.slash_command(name="invite_report", description="View invite join trends")
+@discord.option(
+    name="granularity",
+    description="Bucket size of the trend",
+    choices=["day", "hour"],
+    required=False,
+    default="day"
+)
+@discord.option(
+    name="days",
+    description="How many days to report on",
+    input_type=int,
+    min_value=1,
+    max_value=90,
+    required=False,
+    default=7
+)
+async def invite_report(ctx: discord.ApplicationContext, invite_code: str = TARGET_INVITE_CODE,
+                        granularity: str = "day", days: int = 7):
+    """Display join trends for an invite code from the pre-aggregated counters"""
+    try:
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        buckets = invite_counters.get_buckets(invite_code, granularity, since)
+
+        # Fill empty buckets so the trend has one value per hour/day
+        step = invite_counters.GRANULARITIES[granularity]
+        joins_by_bucket = {invite_counters.floor_bucket(b['bucket'], granularity): b['joins'] for b in buckets}
+        current = invite_counters.floor_bucket(since, granularity)
+        now = datetime.now(timezone.utc)
+        trend = []
+        while current <= now:
+            trend.append((current, joins_by_bucket.get(current, 0)))
+            current += step
+
+        total_joins = sum(b['joins'] for b in buckets)
+        bots = sum(b['bots'] for b in buckets)
+        account_ages = {}
+        for b in buckets:
+            for label, count in b['account_age'].items():
+                account_ages[label] = account_ages.get(label, 0) + count
+
+        embed = discord.Embed(
+            title=f"📈 Invite Report: {invite_code}",
+            description=f"Last {days} days, per {granularity}",
+            color=discord.Color.blue()
+        )
+        embed.add_field(name="Total Joins", value=str(total_joins), inline=True)
+        embed.add_field(name="Humans", value=str(total_joins - bots), inline=True)
+        embed.add_field(name="Bot Ratio", value=f"{bots / total_joins:.1%}" if total_joins else "-", inline=True)
+        embed.add_field(name="Trend", value=f"`{sparkline([joins for _, joins in trend], max_length=1000)}`", inline=False)
+
+        if granularity == "day":
+            daily_text = '\n'.join(f"{bucket:%Y-%m-%d}: {joins}" for bucket, joins in trend[-14:])
+            embed.add_field(name="Joins per Day", value=daily_text, inline=False)
+        else:
+            peak_bucket, peak_joins = max(trend, key=lambda x: x[1])
+            embed.add_field(name="Peak Hour", value=f"<t:{int(peak_bucket.timestamp())}:f> ({peak_joins} joins)", inline=False)
+
+        if account_ages:
+            labels = [label for label, _ in invite_counters.ACCOUNT_AGE_BUCKETS] + ['unknown']
+            age_text = '\n'.join(f"{label}: {account_ages[label]}" for label in labels if account_ages.get(label))
+            embed.add_field(name="Account Age", value=age_text, inline=False)
+
+        await ctx.respond(embed=embed, ephemeral=True)
+
+    except Exception as e:
+        await ctx.respond(f"Error fetching report: {str(e)}", ephemeral=True)
+
+
+@bot.slash_command(name="profile", description="Profile the bot for a few seconds and report the hottest functions")
+@discord.default_permissions(administrator=True)
+@discord.option(
+    name="seconds",
+    description="How long to sample for",
+    input_type=int,
+    min_value=1,
+    max_value=60,
+    required=False,
+    default=10
+)
+async def profile(ctx: discord.ApplicationContext, seconds: int = 10):
+    """Run a sampling profiler on the event loop and return the report as an attachment"""
+    await ctx.defer(ephemeral=True)
+    try:
+        report = await profiler.profile(seconds)
+        report += "\n\n" + channel_maintenance.format_stats()
+        await ctx.followup.send(
+            f"Profiled for {seconds}s",
+            file=discord.File(io.BytesIO(report.encode()), filename="profile.txt"),
+            ephemeral=True
+        )
+    except Exception as e:
+        await ctx.followup.send(f"Error while profiling: {str(e)}", ephemeral=True)
+
+
 if __name__ == '__main__':
     try:
         bot.run(os.getenv('TOKEN'))
     finally:
+        profiler.shutdown()
         posthog_tracker.shutdown()
         mongo.close()
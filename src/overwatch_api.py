@@ -1,15 +1,26 @@
 from typing import Dict, Union
 import requests
 import logging
+import os
 import time
 from random import uniform
 
+from overwatch_fixtures import DEFAULT_FIXTURES_PATH, FaultInjector, FixtureStore, replay_response
+
 
 class OverwatchAPI:
     def __init__(self):
-        self.BASE_URL = "https://overfast-api.tekrop.fr"
+        self.BASE_URL = os.getenv('OVERWATCH_API_BASE_URL', "https://overfast-api.tekrop.fr")
         self.USER_AGENT = "Wintons-Corner_Bot/1.0 (https://github.com/CreedsCode/Winton-s-Corner-Bot)"
 
+        # live: call the API, record: call the API and save the summaries, replay: serve saved summaries
+        self.mode = os.getenv('OVERWATCH_API_MODE', 'live').lower()
+        if self.mode not in ('live', 'record', 'replay'):
+            raise ValueError(f"Unknown OVERWATCH_API_MODE: {self.mode}")
+        self.fixtures = FixtureStore(os.getenv('OVERWATCH_API_FIXTURES', DEFAULT_FIXTURES_PATH)) \
+            if self.mode != 'live' else None
+        self.faults = FaultInjector.from_env() if self.mode == 'replay' else None
+
     def get_player_summary(
             self,
             player_id: str,
@@ -53,10 +64,17 @@ class OverwatchAPI:
         return None
 
     def __get_player_summary(self, urlsafe_player_id: str) -> Dict:
-        response = requests.get(
-            f"{self.BASE_URL}/players/{urlsafe_player_id}/summary",
-            headers={
-                "User-Agent": self.USER_AGENT,
-            })
+        url = f"{self.BASE_URL}/players/{urlsafe_player_id}/summary"
+        if self.mode == 'replay':
+            response = replay_response(self.fixtures, self.faults, url, urlsafe_player_id)
+        else:
+            response = requests.get(
+                url,
+                headers={
+                    "User-Agent": self.USER_AGENT,
+                })
         response.raise_for_status()
-        return response.json()
+        summary = response.json()
+        if self.mode == 'record':
+            self.fixtures.put(urlsafe_player_id, summary)
+        return summary
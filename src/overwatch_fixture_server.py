@@ -0,0 +1,67 @@
+"""
+Serve recorded Overwatch API fixtures on localhost
+
+Point the bot at it with OVERWATCH_API_BASE_URL=http://localhost:8081. Latency,
+error and 429 injection are configured with the OVERWATCH_REPLAY_* variables.
+
+Usage: python src/overwatch_fixture_server.py [--port 8081] [--fixtures PATH]
+"""
+import argparse
+import os
+import re
+from urllib.parse import unquote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from dotenv import load_dotenv
+
+from overwatch_fixtures import DEFAULT_FIXTURES_PATH, FaultInjector, FixtureStore, replay
+
+SUMMARY_PATH = re.compile(r'^/players/([^/]+)/summary/?$')
+
+
+def make_handler(store: FixtureStore, faults: FaultInjector):
+    class FixtureHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            match = SUMMARY_PATH.match(self.path.split('?')[0])
+            if match is None:
+                status, headers, body = 404, {}, b'{"error": "Not found"}'
+            else:
+                # requests percent-encodes non-ASCII battletags, fixtures are stored decoded
+                status, headers, body = replay(store, faults, unquote(match.group(1)))
+
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # One line per request would drown out everything else during load tests
+            pass
+
+    return FixtureHandler
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Serve recorded Overwatch API fixtures")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--fixtures", default=os.getenv('OVERWATCH_API_FIXTURES', DEFAULT_FIXTURES_PATH))
+    args = parser.parse_args()
+
+    store = FixtureStore(args.fixtures)
+    faults = FaultInjector.from_env()
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(store, faults))
+    print(f"Serving {len(store)} fixtures on http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Responses by status: {dict(faults.stats)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+import atexit
+import copy
+import gzip
+import http
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+import requests
+
+DEFAULT_FIXTURES_PATH = 'fixtures/overwatch_api.json.gz'
+# Recorded summaries are flushed to disk at most this often, and on exit
+SAVE_INTERVAL = 5.0
+
+
+class FixtureStore:
+    """Gzip compressed JSON file of player summaries keyed by url-safe player id"""
+
+    def __init__(self, path: str = DEFAULT_FIXTURES_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._summaries: Dict[str, Dict] = {}
+        self._keys = []
+        self._dirty = False
+        self._last_save = 0.0
+
+        if os.path.exists(path):
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                self._summaries = json.load(f)
+            self._keys = sorted(self._summaries)
+        atexit.register(self.save)
+
+    def __len__(self):
+        return len(self._summaries)
+
+    def get(self, player_id: str) -> Optional[Dict]:
+        """
+        Return the recorded summary of `player_id`
+
+        Unknown players get a copy of a recorded summary picked by a stable hash
+        of their id, so any number of synthetic players can be replayed.
+        """
+        summary = self._summaries.get(player_id)
+        if summary is not None:
+            return summary
+        if not self._keys:
+            return None
+
+        template = self._summaries[self._keys[zlib.crc32(player_id.encode()) % len(self._keys)]]
+        summary = copy.deepcopy(template)
+        summary['username'] = player_id.split('-')[0]
+        return summary
+
+    def put(self, player_id: str, summary: Dict):
+        with self._lock:
+            if player_id not in self._summaries:
+                self._keys.append(player_id)
+                self._keys.sort()
+            self._summaries[player_id] = summary
+            self._dirty = True
+        if time.monotonic() - self._last_save >= SAVE_INTERVAL:
+            self.save()
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                json.dump(self._summaries, f)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+            self._last_save = time.monotonic()
+
+
+class FaultInjector:
+    """Adds latency, server errors and rate limits to replayed responses"""
+
+    def __init__(
+            self,
+            latency_ms: float = 0.0,
+            error_rate: float = 0.0,
+            rate_limit_rate: float = 0.0,
+            retry_after: float = 1.0,
+            seed: Optional[int] = None
+    ):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.stats = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'FaultInjector':
+        seed = os.getenv('OVERWATCH_REPLAY_SEED')
+        return cls(
+            latency_ms=float(os.getenv('OVERWATCH_REPLAY_LATENCY_MS', '0')),
+            error_rate=float(os.getenv('OVERWATCH_REPLAY_ERROR_RATE', '0')),
+            rate_limit_rate=float(os.getenv('OVERWATCH_REPLAY_429_RATE', '0')),
+            retry_after=float(os.getenv('OVERWATCH_REPLAY_RETRY_AFTER', '1')),
+            seed=int(seed) if seed else None
+        )
+
+    def next_status(self) -> Optional[int]:
+        """Sleep for the configured latency and return the status to fail with, if any"""
+        with self._lock:
+            # +-50% jitter around the configured latency
+            latency = self.latency_ms * self._random.uniform(0.5, 1.5) / 1000
+            roll = self._random.random()
+        if latency:
+            time.sleep(latency)
+
+        status = None
+        if roll < self.rate_limit_rate:
+            status = 429
+        elif roll < self.rate_limit_rate + self.error_rate:
+            status = 500
+        with self._lock:
+            self.stats[status or 200] += 1
+        return status
+
+
+def replay(store: FixtureStore, faults: FaultInjector, player_id: str) -> Tuple[int, Dict[str, str], bytes]:
+    """Return the status, headers and body the API would have answered for `player_id` with"""
+    status = faults.next_status()
+    if status == 429:
+        return 429, {'Retry-After': str(faults.retry_after)}, b'{"error": "API has been rate limited"}'
+    if status is not None:
+        return status, {}, b'{"error": "Injected server error"}'
+
+    summary = store.get(player_id)
+    if summary is None:
+        return 404, {}, b'{"error": "Player not found"}'
+    return 200, {'Content-Type': 'application/json'}, json.dumps(summary).encode()
+
+
+def replay_response(store: FixtureStore, faults: FaultInjector, url: str, player_id: str) -> requests.Response:
+    """In-process replay, builds the requests.Response the live API call would have returned"""
+    status, headers, body = replay(store, faults, player_id)
+    response = requests.Response()
+    response.status_code = status
+    response.reason = http.HTTPStatus(status).phrase
+    response.headers.update(headers)
+    response.url = url
+    response._content = body
+    return response
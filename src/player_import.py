@@ -0,0 +1,174 @@
+import asyncio
+import csv
+import io
+import logging
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import requests
+from pymongo import UpdateOne
+
+from overwatch_api import OverwatchAPI
+from player_stat import PlayerStat
+from util import validate_battletag
+
+overwatch_api = OverwatchAPI()
+
+# How many players are fetched from the Overwatch API at the same time
+FETCH_CONCURRENCY = 4
+
+ProgressCallback = Callable[[int, int], Awaitable[None]]
+
+
+def parse_players_csv(text: str) -> Tuple[List[PlayerStat], List[str]]:
+    """
+    Parse `discord_id,battletag` rows
+
+    A header row is skipped if present. Returns the valid players and a list of
+    error messages for the rows that were rejected.
+    """
+    players = {}
+    errors = []
+
+    for line_number, row in enumerate(csv.reader(io.StringIO(text)), 1):
+        if not row or not ''.join(row).strip():
+            continue
+        if len(row) != 2:
+            errors.append(f"Line {line_number}: expected `discord_id,battletag`")
+            continue
+
+        discord_id, battletag = row[0].strip(), row[1].strip()
+        if line_number == 1 and not discord_id.isdigit():
+            # header
+            continue
+        if not discord_id.isdigit():
+            errors.append(f"Line {line_number}: invalid discord id `{discord_id}`")
+            continue
+
+        error = validate_battletag(battletag)
+        if error:
+            errors.append(f"Line {line_number}: invalid battletag `{battletag}`")
+            continue
+
+        # Later rows win when a discord id is listed twice
+        players[int(discord_id)] = PlayerStat(discord_id=int(discord_id), blizzard_username=battletag)
+
+    return list(players.values()), errors
+
+
+def adopt_legacy_players(collection, discord_ids: List[int], legacy_guild_id: Optional[int]):
+    """
+    Add players registered before guild scoping to the legacy guild
+
+    They are shown on the legacy guild's leaderboard while their guild_ids are
+    empty. Call this before adding another guild, otherwise they would drop off it.
+    """
+    if legacy_guild_id is None or not discord_ids:
+        return
+    collection.update_many(
+        {"discord_id": {"$in": discord_ids},
+         "$or": [{"guild_ids": {"$exists": False}}, {"guild_ids": []}]},
+        {"$set": {"guild_ids": [legacy_guild_id]}}
+    )
+
+
+def upsert_players(
+        collection,
+        players: List[PlayerStat],
+        guild_id: Optional[int] = None,
+        legacy_guild_id: Optional[int] = None
+) -> List[dict]:
+    """
+    Write all players in a single bulk_write and return the documents of the players to fetch
+
+    Those are the newly created players and existing players whose battletag
+    changed, as their stored stats belong to the old account. When `guild_id`
+    is given the players are added to that guild's leaderboard, existing
+    players without a guild keep their place on `legacy_guild_id`'s.
+    """
+    if not players:
+        return []
+
+    previous_battletags = {
+        player['discord_id']: player['blizzard_username']
+        for player in collection.find(
+            {"discord_id": {"$in": [player.discord_id for player in players]}},
+            {"discord_id": 1, "blizzard_username": 1}
+        )
+    }
+    changed_players = [
+        player.__dict__ for player in players
+        if player.discord_id in previous_battletags and previous_battletags[player.discord_id] != player.blizzard_username
+    ]
+
+    if guild_id is not None:
+        adopt_legacy_players(collection, list(previous_battletags), legacy_guild_id)
+
+    operations = []
+    for player in players:
+        document = dict(player.__dict__)
+        discord_id = document.pop('discord_id')
+        battletag = document.pop('blizzard_username')
+        document.pop('guild_ids')
+        update = {"$set": {"blizzard_username": battletag}, "$setOnInsert": document}
+        if guild_id is not None:
+            update["$addToSet"] = {"guild_ids": guild_id}
+        else:
+            document['guild_ids'] = []
+        operations.append(UpdateOne({"discord_id": discord_id}, update, upsert=True))
+
+    result = collection.bulk_write(operations, ordered=False)
+    # upserted_ids maps the operation index to the new _id
+    return [players[index].__dict__ for index in result.upserted_ids] + changed_players
+
+
+async def fetch_stats(
+        collection,
+        players: List[dict],
+        concurrency: int = FETCH_CONCURRENCY,
+        progress: Optional[ProgressCallback] = None
+) -> int:
+    """
+    Fetch and store stats for `players` with at most `concurrency` requests in flight
+
+    Players sharing a battletag (e.g. the same account registered in several
+    guilds) are fetched once and the result is stored for all of them. The
+    Overwatch API client is blocking, so every fetch runs in a worker thread.
+    Progress is reported per battletag. Returns the number of players whose
+    stats were stored.
+    """
+    discord_ids_by_battletag = {}
+    for player in players:
+        battletag = player['blizzard_username']
+        discord_ids_by_battletag.setdefault(battletag.lower(), (battletag, []))[1].append(player['discord_id'])
+
+    semaphore = asyncio.Semaphore(concurrency)
+    total = len(discord_ids_by_battletag)
+    done = 0
+    stored = 0
+
+    async def fetch(battletag, discord_ids):
+        nonlocal done, stored
+        logging.debug("Fetching player stats for %s" % battletag)
+        async with semaphore:
+            try:
+                summary = await asyncio.to_thread(overwatch_api.get_player_summary, battletag)
+                if summary is not None:
+                    await asyncio.to_thread(
+                        collection.update_many,
+                        {"discord_id": {"$in": discord_ids}},
+                        {"$push": {"stats": summary},
+                         "$set": {"last_fetched": datetime.now(timezone.utc)}}
+                    )
+                    stored += len(discord_ids)
+            except requests.HTTPError as e:
+                logging.error("Failed to fetch or save player stats for %s: %s" % (battletag, str(e)))
+            except Exception as e:
+                logging.error("Unknown error while fetching stats for %s: %s" % (battletag, str(e)))
+
+        done += 1
+        if progress is not None:
+            await progress(done, total)
+
+    await asyncio.gather(*(fetch(battletag, discord_ids) for battletag, discord_ids in discord_ids_by_battletag.values()))
+    return stored
@@ -0,0 +1,12 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+
+
+@dataclass
+class PlayerStat:
+    discord_id: int
+    blizzard_username: str
+    # Guilds whose leaderboard this player is shown on
+    guild_ids: list = field(default_factory=list)
+    last_fetched: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    stats: list = field(default_factory=list)
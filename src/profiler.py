@@ -0,0 +1,171 @@
+import asyncio
+import functools
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import Optional
+
+_watchdog_thread = None
+_heartbeat_task = None
+_stop_event = threading.Event()
+_loop_thread_id = None
+_last_beat = 0.0
+
+# name -> {'calls', 'total', 'max', 'last'} in seconds
+_coroutine_timings = {}
+
+
+def init(loop: asyncio.AbstractEventLoop):
+    """
+    Start the event-loop stall watchdog if LOOP_STALL_THRESHOLD_MS is set
+
+    Must be called from inside the running loop (e.g. on_ready).
+    """
+    global _watchdog_thread, _heartbeat_task, _loop_thread_id, _last_beat
+
+    threshold_ms = os.getenv('LOOP_STALL_THRESHOLD_MS')
+    if not threshold_ms:
+        print("LOOP_STALL_THRESHOLD_MS not set. Event-loop watchdog disabled.")
+        return
+    if _watchdog_thread is not None:
+        return
+
+    threshold = float(threshold_ms) / 1000
+    _loop_thread_id = threading.get_ident()
+    _last_beat = time.monotonic()
+    _stop_event.clear()
+
+    _heartbeat_task = loop.create_task(_heartbeat(threshold / 4))
+    _watchdog_thread = threading.Thread(
+        target=_watch, args=(threshold,), name="loop-watchdog", daemon=True)
+    _watchdog_thread.start()
+    print(f"Event-loop watchdog started (threshold: {threshold_ms}ms)")
+
+
+async def _heartbeat(interval: float):
+    global _last_beat
+
+    while True:
+        _last_beat = time.monotonic()
+        await asyncio.sleep(interval)
+
+
+def _watch(threshold: float):
+    reported = False
+    while not _stop_event.wait(threshold / 4):
+        stalled_for = time.monotonic() - _last_beat
+        if stalled_for < threshold:
+            reported = False
+            continue
+        # Only dump the stack once per stall
+        if reported:
+            continue
+        reported = True
+
+        frame = sys._current_frames().get(_loop_thread_id)
+        stack = ''.join(traceback.format_stack(frame)) if frame else '<no frame>'
+        logging.warning(
+            "Event loop stalled for %.0fms, blocking code:\n%s" % (stalled_for * 1000, stack))
+
+
+def timed(name: str):
+    """Decorator recording wall-clock timings of a coroutine function under `name`"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                _record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def _record(name: str, duration: float):
+    timing = _coroutine_timings.setdefault(name, {'calls': 0, 'total': 0.0, 'max': 0.0, 'last': 0.0})
+    timing['calls'] += 1
+    timing['total'] += duration
+    timing['max'] = max(timing['max'], duration)
+    timing['last'] = duration
+
+
+def format_timings() -> str:
+    lines = ["Coroutine timings (seconds)", f"{'name':<40} {'calls':>6} {'avg':>9} {'max':>9} {'last':>9}"]
+    for name, timing in sorted(_coroutine_timings.items()):
+        avg = timing['total'] / timing['calls'] if timing['calls'] else 0
+        lines.append(f"{name:<40} {timing['calls']:>6} {avg:>9.3f} {timing['max']:>9.3f} {timing['last']:>9.3f}")
+    if len(lines) == 2:
+        lines.append("(no timings recorded yet)")
+    return '\n'.join(lines)
+
+
+async def profile(seconds: float, interval: float = 0.005, top: int = 30,
+                  thread_id: Optional[int] = None) -> str:
+    """
+    Sample the event-loop thread's stack for `seconds` and return a text report
+
+    The sampler runs in a worker thread so the loop keeps running normally
+    while it is being observed.
+    """
+    target = thread_id or threading.get_ident()
+    return await asyncio.to_thread(_sample, target, seconds, interval, top)
+
+
+def _sample(thread_id: int, seconds: float, interval: float, top: int) -> str:
+    self_counts = Counter()
+    total_counts = Counter()
+    samples = 0
+
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        frame = sys._current_frames().get(thread_id)
+        if frame is not None:
+            samples += 1
+            self_counts[_describe(frame)] += 1
+            seen = set()
+            while frame is not None:
+                key = _describe(frame)
+                if key not in seen:
+                    total_counts[key] += 1
+                    seen.add(key)
+                frame = frame.f_back
+        time.sleep(interval)
+
+    lines = [f"Sampled {samples} stacks over {seconds:.1f}s ({interval * 1000:.0f}ms interval)", ""]
+    lines.append("Top functions by self samples")
+    lines.extend(_format_counts(self_counts, samples, top))
+    lines.append("")
+    lines.append("Top functions by cumulative samples")
+    lines.extend(_format_counts(total_counts, samples, top))
+    lines.append("")
+    lines.append(format_timings())
+    return '\n'.join(lines)
+
+
+def _describe(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+
+
+def _format_counts(counts: Counter, samples: int, top: int):
+    if not samples:
+        return ["(no samples)"]
+    return [f"{count:>7} {count / samples:>7.1%}  {name}" for name, count in counts.most_common(top)]
+
+
+def shutdown():
+    """Stop the watchdog thread and heartbeat task"""
+    global _watchdog_thread, _heartbeat_task
+
+    _stop_event.set()
+    if _heartbeat_task is not None:
+        _heartbeat_task.cancel()
+        _heartbeat_task = None
+    if _watchdog_thread is not None:
+        _watchdog_thread.join(timeout=1)
+        _watchdog_thread = None
@@ -1,2 +1,26 @@
 def truncate_string(text, max_length):
     return (text[:max_length - 3] + '...') if len(text) > max_length else text
+
+
+def validate_battletag(username):
+    """Returns an error message if `username` is not a valid Blizzard username, otherwise None"""
+    # check for presence of one '#'
+    if not username or '#' not in username:
+        return "Please provide a valid Blizzard username (e.g., Player#123456)."
+    # check for tag length
+    tag = username.split('#')[-1]
+    if len(tag) > 6 or len(tag) < 4 or not tag.isdigit():
+        return "Please provide a valid Blizzard username with a tag (e.g., Player#123456)."
+    return None
+
+
+def sparkline(values, max_length=None):
+    blocks = "▁▂▃▄▅▆▇█"
+    if max_length and len(values) > max_length:
+        # Sum neighbouring values so the line fits into max_length characters
+        size = -(-len(values) // max_length)
+        values = [sum(values[i:i + size]) for i in range(0, len(values), size)]
+    highest = max(values, default=0)
+    if highest == 0:
+        return blocks[0] * len(values)
+    return ''.join(blocks[round(value / highest * (len(blocks) - 1))] for value in values)